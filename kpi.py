@@ -54,6 +54,7 @@ from __future__ import print_function, division, absolute_import
 import numpy as np
 from golang import func
 
+import functools
 import warnings
 
 
@@ -79,6 +80,9 @@ import warnings
 class Calc:
     # ._data            []Measurement - fully inside [.τ_lo, .τ_hi)
     # [.τ_lo, .τ_hi)    time interval to compute over. Potentially wider than originally requested.
+    # ._mlog            MeasurementLog ._data was taken from
+    # ._s               ._data[0] is ._mlog measurement with serial number ._s  (see MeasurementLog._ndel)
+    # ._cols            {} name -> []   ; columns of ._data retrieved via ._col()
     pass
 
 
@@ -112,12 +116,36 @@ class Calc:
 # MeasurementLog provides following operations:
 #
 #   .append(Measurement)        - add new Measurement to the tail of MeasurementLog
+#   .extend([]Measurement)      - add several new Measurements to the tail of MeasurementLog
 #   .forget_past(Tcut)          - forget measurements with .Tstart ≤ Tcut
 #   .data()                     - get 2D array with measurements data
+#   .column(name)               - get array with data of one field for all measurements
+#
+# .column provides column-organized view of the data, which is more efficient
+# for computations that go through values of only several fields. Columns are
+# materialized on first use and are further kept in sync on append.
+#
+# Logged measurements never change: arrays returned by .data() and .column()
+# are read-only. Columns and KPIs memoized in the log rely on this.
+#
+# KPIs computed by Calc over measurements of the log are memoized in the log
+# itself. .kpicache_max limits how many results are kept; it is 128 by default
+# and 0 disables the memoization. Most results are small, but one
+# ΣMeasurement from Calc.aggregate takes ~63KB, so in the worst case the
+# default limit costs ~8MB per log.
 #
 # See also: Measurement.
 class MeasurementLog:
-    # ._data    []Measurement
+    # ._buf     []Measurement           ; storage with capacity; data is ._buf[:._len]
+    #           (after forget_past ._buf & co can be views past forgotten measurements)
+    # ._len     number of measurements in the log
+    # ._tstart  []Ttime     ; = ._buf['X.Tstart']             contiguous, for binary search
+    # ._tend    []Ttime     ; = ._buf['X.Tstart'] + ['X.δT']  ----//----
+    # ._cols    {} name -> []   ; = ._buf[name] for columns materialized by .column()
+    # ._ndel    number of measurements deleted by .forget_past so far
+    #           (i'th measurement in .data() has serial number ._ndel+i)
+    # ._kpicache {} (kpi, s, n, τ_lo, τ_hi) -> result  ; KPIs computed over measurements
+    #           with serial numbers [s, s+n) and [τ_lo, τ_hi) (see _memoize)
     pass
 
 
@@ -293,31 +321,45 @@ class ΣMeasurement(np.void):
 # Measurement() creates new Measurement instance with all data initialized to NA.
 @func(Measurement)
 def __new__(cls):
-    m = _newscalar(cls, cls._dtype)
+    return _newscalar(cls, cls._dtype, cls._NA_bytes)
+
+# ΣMeasurement() creates new ΣMeasurement instance.
+#
+# For all fields .value is initialized with NA and .τ_na with 0.
+@func(ΣMeasurement)
+def __new__(cls):
+    return _newscalar(cls, cls._dtype, cls._NA_bytes)
+
+# _fillNA initializes all data of Measurement to NA.
+#
+# it is used only once to prepare Measurement._NA_bytes template which
+# Measurement() copies instead of initializing every field on every call.
+@func(Measurement)
+def _fillNA(m):
+    fields = m._dtype0.fields
     for field in m._dtype0.names:
-        fdtype = m.dtype.fields[field][0]
+        fdtype = fields[field][0]
         if fdtype.shape == ():
             m[field] = NA(fdtype)           # scalar
         else:
             m[field][:] = NA(fdtype.base)   # subarray
-    return m
 
-# ΣMeasurement() creates new ΣMeasurement instance.
+# _fillNA initializes ΣMeasurement .value with NA and .τ_na with 0.
 #
-# For all fields .value is initialized with NA and .τ_na with 0.
+# it is used only once to prepare ΣMeasurement._NA_bytes template.
 @func(ΣMeasurement)
-def __new__(cls):
-    Σ = _newscalar(cls, cls._dtype)
-    for field in Σ.dtype.names:
-        fdtype = Σ.dtype.fields[field][0]
-        if fdtype.shape != ():              # skip subarrays - rely on aliases
-            continue
+def _fillNA(Σ):
+    fields = Σ._dtype0.fields
+    for field in Σ._dtype0.names:
+        fdtype = fields[field][0]
         if field.startswith('X.'):          # X.Tstart, X.δT
             Σ[field] = NA(fdtype)
-        else:
+        elif fdtype.shape == ():
             Σ[field]['value'] = NA(fdtype.fields['value'][0])
             Σ[field]['τ_na']  = 0
-    return Σ
+        else:                               # subarray - fill all its elements at once
+            Σ[field]['value'][:] = NA(fdtype.base.fields['value'][0])
+            Σ[field]['τ_na'][:]  = 0
 
 # Stat() creates new Stat instance with specified values and dtype.
 @func(Stat)
@@ -342,6 +384,7 @@ def __new__(cls, min, avg, max, dtype=np.float64):
 # _all_qci expands <name>.QCI into <name>.sum and [] of <name>.<qci> for all possible qci values.
 # TODO remove and use direct array access (after causes are expanded into array too)
 nqci = 256 # all possible QCIs ∈ [0,255], standard ones are described in 23.203 Table 6.1.7
+@functools.lru_cache(maxsize=None)  # names are queried by hot code over and over
 def _all_qci(name_qci: str): # -> name_sum, ()name_qciv
     if not name_qci.endswith(".QCI"):
         raise AssertionError("invalid name_qci %r: no .QCI suffix" % name_qci)
@@ -350,6 +393,7 @@ def _all_qci(name_qci: str): # -> name_sum, ()name_qciv
     return name+".sum", name_qciv
 
 # _all_cause expands <name>.CAUSE into <name>.sum and [] of <name>.<cause> for all possible cause values.
+@functools.lru_cache(maxsize=None)
 def _all_cause(name_cause: str): # -> name_sum, ()name_causev
     if not name_cause.endswith(".CAUSE"):
         raise AssertionError("invalid name_cause %r: no .CAUSE suffix" % name_cause)
@@ -380,22 +424,18 @@ def _(Klass):
     _dtype = np.dtype(expv)
 
     # also provide .QCI aliases, e.g. X.5 -> X.QCI[5]
-    namev   = []
-    formatv = []
-    offsetv = []
-    for name in _dtype.names:
-        fd, off = _dtype.fields[name]
-        namev  .append(name)
-        formatv.append(fd)
-        offsetv.append(off)
+    fields  = _dtype.fields
+    namev   = list(_dtype.names)
+    formatv = [fields[_][0] for _ in namev]
+    offsetv = [fields[_][1] for _ in namev]
 
     for qname in qnamev:
-        qarr, off0 = _dtype.fields[qname+'.QCI']
+        qarr, off0 = fields[qname+'.QCI']
         assert len(qarr.shape) == 1
-        for qci in range(qarr.shape[0]):
-            namev  .append('%s.%d' % (qname, qci))
-            formatv.append(qarr.base)
-            offsetv.append(off0 + qci*qarr.base.itemsize)
+        n = qarr.shape[0]
+        namev  .extend(_all_qci(qname+'.QCI')[1][:n])
+        formatv.extend([qarr.base]*n)
+        offsetv.extend((off0 + np.arange(n)*qarr.base.itemsize).tolist())
 
     Klass._dtype0 = _dtype  # ._dtype without aliases
     Klass._dtype  = np.dtype({
@@ -408,14 +448,36 @@ _(Measurement)
 _(ΣMeasurement)
 del _
 
+# Measurement._fieldv lists fields of Measurement._dtype0, i.e. without .QCI
+# aliases, excluding X.Tstart and X.δT, together with their kind - np.number,
+# StatT or Stat. For .QCI subarrays the kind is the kind of their elements.
+#
+# It is prepared once, so that code, that goes through all values of many
+# measurements, does not need to introspect dtype for every field.
+def _():
+    fieldv = []
+    fields = Measurement._dtype0.fields
+    for name in Measurement._dtype0.names:
+        if name.startswith('X.'):           # X.Tstart, X.δT
+            continue
+        fdtype = fields[name][0]
+        for kind in (np.number, StatT, Stat):
+            if issubclass(fdtype.base.type, kind):
+                break
+        else:
+            raise AssertionError("Measurement: %s: unexpected type %r" % (name, fdtype.base.type))
+        fieldv.append((name, kind))
+    Measurement._fieldv = tuple(fieldv)
+_()
+del _
+
 
 # __repr__ returns "Measurement(f1=..., f2=..., ...)".
 # fields with NA value are omitted.
 @func(Measurement)
 def __repr__(m):
     initv = []
-    for field in m._dtype0.names:
-        vs = _vstr(m[field])
+    for field, vs in m._vstrv():
         if vs != 'ø':
             initv.append("%s=%s" % (field, vs))
     return "Measurement(%s)" % ', '.join(initv)
@@ -427,10 +489,28 @@ def __repr__(m):
 @func(Measurement)
 def __str__(m):
     vv = []
-    for field in m._dtype0.names:
-        vv.append(_vstr(m[field]))
+    for field, vs in m._vstrv():
+        vv.append(vs)
     return "(%s)" % ', '.join(vv)
 
+# _vstrv returns [](field, _vstr(m[field])) for all fields of m.
+#
+# Fields are usually mostly NA. Those are detected by comparing raw bytes of
+# the field with raw bytes of NA template, without retrieving and inspecting
+# the values.
+@func(Measurement)
+def _vstrv(m): # -> [](field, str)
+    raw = m.tobytes()
+    na  = Measurement._NA_bytes
+    vsv = []
+    for field, lo, hi in Measurement._fieldrawv:
+        if raw[lo:hi] == na[lo:hi]:
+            vs = 'ø'
+        else:
+            vs = _vstr(m[field])
+        vsv.append((field, vs))
+    return vsv
+
 
 # __repr__ returns Stat(min, avg, max, n, dtype=...)
 # NA values are represented as "ø".
@@ -465,22 +545,21 @@ def _vstr(v):  # -> str
         return 'ø' if isNA(v) else str(v)
 
     assert len(v.shape) == 1
-    if isNA(v).all():                       # subarray full of ø
+    na = isNA(v)
+    if na.all():                            # subarray full of ø
         return 'ø'
 
+    # find non-zero elements at once, and format only them
+    if v.dtype.names is not None:
+        nz = np.zeros(v.shape, dtype=bool)
+        for name in v.dtype.names:
+            nz |= (v[name] != 0)
+    else:
+        nz = (v != 0)
+
     va = []                                 # subarray with some non-ø data
-    for k in range(v.shape[0]):
-        vk = v[k]
-        if isinstance(vk, np.void):
-            for name in vk.dtype.names:
-                if vk[name] != 0:
-                    break
-            else:
-                continue
-        else:
-            if vk == 0:
-                continue
-        va.append('%d:%s' % (k, 'ø' if isNA(vk) else str(vk)))
+    for k in np.flatnonzero(nz):
+        va.append('%d:%s' % (k, 'ø' if na[k] else str(v[k])))
     return "{%s}" % ' '.join(va)
 
 
@@ -491,101 +570,227 @@ def __eq__(a, b):
     # return np.array_equal(a, b, equal_nan=True) # for NA==NA
     if not isinstance(b, Measurement):
         return False
-    # cast to dtype without aliases to avoid
-    # "dtypes with overlapping or out-of-order fields are not representable as buffers"
-    return a.view(a._dtype0).data.tobytes() == \
-           b.view(b._dtype0).data.tobytes()
+    # compare raw bytes in place without copying them out into bytes objects
+    return np.array_equal(a.reshape(1).view(np.uint8),
+                          b.reshape(1).view(np.uint8))
 
 @func(Measurement)
 def __ne__(a, b):
     return not (a == b)
 
-# _check_valid verifies Measurement data for validity.
+# _check_valid_batch verifies data of array of Measurements for validity.
 #
 # only basic verification are done - those that assert the most essential
-# general invariants.
-@func(Measurement)
-def _check_valid(m):
-    _badv = []
-    def bad(text):
-        _badv.append(text)
+# general invariants. Every check is done for all measurements, and for whole
+# .QCI subarrays, at once.
+#
+# Detected problems are returned as [](i, text) with i being index of
+# problematic measurement in a.
+def _check_valid_batch(a): # -> [](i, text)
+    badv = []
 
     # Tstart and δT must be present     TODO consider relaxing, e.g. we know δT, but not Tstart
     for f in ('X.Tstart', 'X.δT'):
-        if isNA(m[f]):
-            bad("%s = ø" % f)
-
-    for field in m.dtype.names:
-        v = m[field]
-        if v.shape != ():   # skip subarrays - rely on aliases
-            continue
-        if isNA(v):
-            continue
-
-        # * ≥ 0
-        if not isinstance(v, np.void):
-            if v < 0:
-                bad(".%s < 0  (%s)" % (field, v))
+        for i in np.flatnonzero(isNA(a[f])):
+            badv.append((i, "%s = ø" % f))
+
+    # * ≥ 0
+    for field, vfield in _check_ge0:
+        v = a[field]
+        if vfield is not None:
+            v = v[vfield]
+        for idx in zip(*np.nonzero(~isNA(v) & (v < 0))):
+            name = _check_fname(field, idx)
+            if vfield is not None:
+                name += '.' + vfield
+            badv.append((idx[0], ".%s < 0  (%s)" % (name, v[idx])))
+
+    # fini ≤ init
+    for ffini, finit in _check_finiinit:
+        vfini = a[ffini]
+        vinit = a[finit]
+        for idx in zip(*np.nonzero(~isNA(vfini) & ~isNA(vinit) & ~(vfini <= vinit))):
+            badv.append((idx[0], "fini > init (%s(%s) / %s(%s)" % (
+                        vfini[idx], _check_fname(ffini, idx),
+                        vinit[idx], _check_fname(finit, idx))))
+
+    badv.sort(key=lambda _: _[0])
+    return badv
+
+# _check_fname returns name of scalar field, or .QCI alias, that corresponds to index idx in a[field].
+def _check_fname(field, idx):
+    if len(idx) == 1:
+        return field
+    qci, = idx[1:]
+    return '%s.%d' % (field[:-len('.QCI')], qci)    # X.QCI[qci] -> X.qci
+
+# precompute what _check_valid_batch verifies:
+#
+# _check_ge0        [](field, vfield|None)  fields and Stat subfields to be ≥ 0
+# _check_finiinit   [](ffini, finit)        fields for which fini ≤ init,
+#                                           e.g. RRC.ConnEstabSucc.sum ≤ RRC.ConnEstabAtt.sum
+def _():
+    global _check_ge0, _check_finiinit
+    _check_ge0      = []
+    _check_finiinit = []
+    dtype = Measurement._dtype0
+    for field in dtype.names:
+        fdtype = dtype.fields[field][0].base
+        if fdtype.names is None:
+            _check_ge0.append((field, None))
         else:
-            for vfield in v.dtype.names:
-                vf = v[vfield]
-                if not isNA(vf) and vf < 0:
-                    bad(".%s.%s < 0  (%s)" % (field, vfield, vf))
+            for vfield in fdtype.names:
+                _check_ge0.append((field, vfield))
 
-        # fini ≤ init
         if "Succ" in field:
             finit = field.replace("Succ", "Att")  # e.g. RRC.ConnEstabSucc.sum -> RRC.ConnEstabAtt.sum
-            vinit = m[finit]
-            if not isNA(vinit):
-                if not (v <= vinit):
-                    bad("fini > init (%s(%s) / %s(%s)" % (v, field, vinit, finit))
+            if finit in dtype.names:
+                _check_finiinit.append((field, finit))
+_()
+del _
 
-    if len(_badv) > 0:
-        raise AssertionError("invalid Measurement data. the following problems were detected:" +
-                             "\n- " + "\n- ".join(_badv))
 
+# _func_nowrap(cls) is like func(cls), but defines the method without wrapping it.
+#
+# func wraps every method to support defer, and the wrapper costs more than
+# tiny helpers, that KPI computations call over and over, do. Those helpers do
+# not use defer and are defined via _func_nowrap instead.
+def _func_nowrap(cls):
+    def _(f):
+        setattr(cls, f.__name__, f)
+    return _
 
 # MeasurementLog() constructs new empty journal for logging measurements.
 @func(MeasurementLog)
 def __init__(mlog):
-    mlog._data = np.ndarray((0,), dtype=(Measurement, Measurement._dtype))
+    mlog._buf    = np.ndarray((0,), dtype=(Measurement, Measurement._dtype0))
+    mlog._len    = 0
+    mlog._tstart = np.ndarray((0,), dtype=Measurement.Ttime)
+    mlog._tend   = np.ndarray((0,), dtype=Measurement.Ttime)
+    mlog._cols   = {}
+    mlog._ndel   = 0
+    mlog._kpicache = {}
+    mlog.kpicache_max = 128
+
+# _realloc switches MeasurementLog to new storage with capacity cap.
+#
+# The old storage is left intact, so that arrays previously returned by .data()
+# and .column() remain valid.
+@func(MeasurementLog)
+def _realloc(mlog, cap):
+    n = mlog._len
+    assert n <= cap
+    def move(a):
+        b = np.ndarray((cap,) + a.shape[1:], dtype=a.dtype)
+        b[:n] = a[:n]
+        return b
+    mlog._switch(move, n, 0)
+
+# _switch switches ._buf, ._tstart, ._tend and columns to f(array).
+# n and i tell the number of measurements after the switch and how many measurements were deleted.
+@func(MeasurementLog)
+def _switch(mlog, f, n, i):
+    mlog._buf    = f(mlog._buf)
+    mlog._tstart = f(mlog._tstart)
+    mlog._tend   = f(mlog._tend)
+    mlog._cols   = {name: f(col)  for name, col in mlog._cols.items()}
+    mlog._len    = n
+    mlog._ndel  += i
 
 # data returns all logged Measurements data as array.
+#
+# The result is read-only.
 @func(MeasurementLog)
 def data(mlog):
-    return mlog._data
+    # NOTE ._buf is kept with dtype0 because numpy does not handle aliased fields on copy
+    data = mlog._buf[:mlog._len].view((Measurement, Measurement._dtype))
+    data.flags.writeable = False
+    return data
+
+# column returns array with data of field name for all logged Measurements.
+#
+# It is equivalent to .data()[name], but the result is contiguous in memory.
+# The result is read-only.
+@_func_nowrap(MeasurementLog)
+def column(mlog, name):
+    col = mlog._cols.get(name)
+    if col is None:
+        data = mlog.data()[name]
+        col  = np.ndarray((len(mlog._buf),) + data.shape[1:], dtype=data.dtype)
+        col[:mlog._len] = data
+        mlog._cols[name] = col
+    col = col[:mlog._len]
+    col.flags.writeable = False
+    return col
 
 # append adds new Measurement to the tail of MeasurementLog.
 @func(MeasurementLog)
 def append(mlog, m: Measurement):
-    m._check_valid()
+    mlog.extend(m.reshape(1))
+
+# extend adds Measurements from array ms to the tail of MeasurementLog.
+#
+# It is equivalent to appending the measurements one by one, but is faster
+# because all measurements are verified at once.
+@func(MeasurementLog)
+def extend(mlog, ms):
+    n = len(ms)
+    if n == 0:
+        return
+
+    badv = _check_valid_batch(ms)
+    if len(badv) > 0:
+        if n == 1:
+            textv = [text for _, text in badv]
+        else:
+            textv = ["[%d] %s" % (i, text) for i, text in badv]
+        raise AssertionError("invalid Measurement data. the following problems were detected:" +
+                             "\n- " + "\n- ".join(textv))
+
     # verify .Tstart↑
-    if len(mlog._data) > 0:
-        m_ = mlog._data[-1]
-        τ   = m ['X.Tstart']
-        τ_  = m_['X.Tstart']
-        δτ_ = m_['X.δT']
-        if not (τ_ < τ):
-            raise AssertionError(".Tstart not ↑  (%s -> %s)" % (τ_, τ))
-        if not (τ_ + δτ_ <= τ):
-            raise AssertionError(".Tstart overlaps with previous measurement: %s ∈ [%s, %s)" %
-                                    (τ, τ_, τ_ + δτ_))
-    _ = np.append(
-            mlog._data.view(Measurement._dtype0), # dtype0 because np.append does not handle aliased
-            m.view(Measurement._dtype0))          # fields as such and increases out itemsize
-    mlog._data = _.view((Measurement, Measurement._dtype))  # np.append looses Measurement from dtype
+    l  = mlog._len
+    τ  = ms['X.Tstart']
+    τe = τ + ms['X.δT']
+    if l > 0:
+        τ_  = np.concatenate(((mlog._tstart[l-1],), τ [:-1]))
+        τe_ = np.concatenate(((mlog._tend  [l-1],), τe[:-1]))
+        τx  = τ
+    else:
+        τ_, τe_, τx = τ[:-1], τe[:-1], τ[1:]
+    for k in np.flatnonzero(~(τ_ < τx) | ~(τe_ <= τx))[:1]:
+        if not (τ_[k] < τx[k]):
+            raise AssertionError(".Tstart not ↑  (%s -> %s)" % (τ_[k], τx[k]))
+        raise AssertionError(".Tstart overlaps with previous measurement: %s ∈ [%s, %s)" %
+                                (τx[k], τ_[k], τe_[k]))
+
+    # grow storage geometrically so that append is amortized O(1)
+    if l + n > len(mlog._buf):
+        mlog._realloc(max(8, 2*len(mlog._buf), l+n))
+
+    mlog._buf   [l:l+n] = ms.view(Measurement._dtype0)
+    mlog._tstart[l:l+n] = τ
+    mlog._tend  [l:l+n] = τe
+    for name, col in mlog._cols.items():
+        col[l:l+n] = ms[name]
+    mlog._len = l + n
 
 # forget_past deletes measurements with .Tstart ≤ Tcut
 @func(MeasurementLog)
 def forget_past(mlog, Tcut):
-    # TODO use np.searchsorted
-    i = 0
-    while i < len(mlog._data):
-        if Tcut < mlog._data[i]['X.Tstart']:
-            break
-        i += 1
-
-    mlog._data = np.delete(mlog._data, slice(i))  # NOTE delete - contrary to append - preserves dtype
+    # find min i: Tcut < [i].Tstart         ; i=l if not found
+    i = np.searchsorted(mlog._tstart[:mlog._len], Tcut, side='right')
+    if i > 0:
+        # advance to views past forgotten measurements without copying the rest
+        mlog._switch(lambda a: a[i:], mlog._len - i, i)
+        # release memory of forgotten measurements by moving the rest to
+        # smaller storage once they become less than ¼ of what is allocated.
+        # The copy is amortized O(1) per forgotten measurement.
+        buf = mlog._buf
+        nalloc = len(buf if buf.base is None else buf.base)
+        if nalloc > 8  and  mlog._len < nalloc//4:
+            mlog._realloc(max(8, 2*mlog._len))
+        # KPIs over forgotten measurements won't be asked for anymore
+        mlog._kpicache = {k: r  for k, r in mlog._kpicache.items()  if k[1] >= mlog._ndel}
 
 # ----------------------------------------
 
@@ -599,26 +804,17 @@ def forget_past(mlog, Tcut):
 def __init__(calc, mlog: MeasurementLog, τ_lo, τ_hi):
     assert τ_lo <= τ_hi
     data = mlog.data()
-    l = len(data)
+
+    # NOTE .Tstart↑ and measurements do not overlap, so both .Tstart and
+    # .Tstart+.δT are sorted and we can use binary search.
 
     # find min i: τ_lo < [i].(Tstart+δT)    ; i=l if not found
-    # TODO binary search
-    i = 0
-    while i < l:
-        m = data[i]
-        m_τhi = m['X.Tstart'] + m['X.δT']
-        if τ_lo < m_τhi:
-            break
-        i += 1
+    l = mlog._len
+    i = np.searchsorted(mlog._tend[:l], τ_lo, side='right')
 
     # find min j: τ_hi ≤ [j].Tstart         ; j=l if not found
-    j = i
-    while j < l:
-        m = data[j]
-        m_τlo = m['X.Tstart']
-        if τ_hi <= m_τlo:
-            break
-        j += 1
+    j = np.searchsorted(mlog._tstart[:l], τ_hi, side='left')
+    j = max(i, j)
 
     data = data[i:j]
     if len(data) > 0:
@@ -630,6 +826,73 @@ def __init__(calc, mlog: MeasurementLog, τ_lo, τ_hi):
     calc._data = data
     calc.τ_lo  = τ_lo
     calc.τ_hi  = τ_hi
+    calc._mlog = mlog
+    calc._s    = mlog._ndel + i
+    calc._cols = {}
+
+# _col returns contiguous array with values of field name for measurements in ._data .
+#
+# The data comes from columns maintained by MeasurementLog.
+@_func_nowrap(Calc)
+def _col(calc, name):
+    col = calc._cols.get(name)
+    if col is None:
+        mlog = calc._mlog
+        i = calc._s - mlog._ndel    # mlog could forget past since calc creation
+        if i >= 0:
+            col = mlog.column(name)[i:i+len(calc._data)]
+        else:
+            col = np.ascontiguousarray(calc._data[name])
+        calc._cols[name] = col
+    return col
+
+
+# _memoize decorates Calc method, that computes a KPI, to cache its results in MeasurementLog.
+#
+# Measurements in the log never change, so the KPI computed over the same
+# measurements and the same [τ_lo, τ_hi) can be reused by further Calc
+# instances that cover the same window. Up to mlog.kpicache_max results are
+# kept with the oldest entries evicted first.
+def _memoize(f):
+    kpi = f.__name__
+    @functools.wraps(f)
+    def _(calc):
+        mlog = calc._mlog
+        if mlog.kpicache_max <= 0:
+            return f(calc)
+        cache = mlog._kpicache
+        key = (kpi, calc._s, len(calc._data), calc.τ_lo, calc.τ_hi)
+        r = cache.get(key)
+        if r is None:
+            r = f(calc)
+            while len(cache) >= mlog.kpicache_max:
+                del cache[next(iter(cache))]
+            cache[key] = r
+        return _copy(r)   # results are mutable
+    return _
+
+# _copy returns copy of KPI result - NumPy array, scalar, or tuple of those.
+def _copy(r):
+    if isinstance(r, tuple):
+        return tuple(_copy(_) for _ in r)
+    if isinstance(r, ΣMeasurement):
+        # NOTE .copy() is very slow for dtype with .QCI aliases - copy raw bytes
+        return _newscalar(ΣMeasurement, ΣMeasurement._dtype, r.view(ΣMeasurement._dtype0).tobytes())
+    return r.copy()
+
+
+# _fcol returns values of field name for measurements in ._data .
+#
+# Contrary to _col, it does not materialize the column in MeasurementLog: the
+# column is used if it is already there, and strided view into the log storage
+# is returned otherwise. This suits code that goes through all fields.
+@_func_nowrap(Calc)
+def _fcol(calc, name):
+    mlog = calc._mlog
+    i = calc._s - mlog._ndel
+    if i >= 0  and  name in mlog._cols:
+        return calc._col(name)
+    return calc._data[name]
 
 
 # erab_accessibility computes "E-RAB Accessibility" KPI.
@@ -644,6 +907,7 @@ def __init__(calc, mlog: MeasurementLog, τ_lo, τ_hi):
 #
 # 3GPP reference: TS 32.450 6.1.1 "E-RAB Accessibility".
 @func(Calc)
+@_memoize
 def erab_accessibility(calc): # -> InitialEPSBEstabSR, AddedEPSBEstabSR
     SR = calc._success_rate
 
@@ -656,8 +920,8 @@ def erab_accessibility(calc): # -> InitialEPSBEstabSR, AddedEPSBEstabSR
     z = SR("Σqci ERAB.EstabInitSuccNbr.QCI",
            "Σqci ERAB.EstabInitAttNbr.QCI")
 
-    InititialEPSBEstabSR = Interval(x['lo'] * y['lo'] * z['lo'],    # x·y·z
-                                    x['hi'] * y['hi'] * z['hi'])
+    InititialEPSBEstabSR = _interval(x['lo'] * y['lo'] * z['lo'],   # x·y·z
+                                     x['hi'] * y['hi'] * z['hi'])
 
     AddedEPSBEstabSR = SR("Σqci ERAB.EstabAddSuccNbr.QCI",
                           "Σqci ERAB.EstabAddAttNbr.QCI")
@@ -699,45 +963,58 @@ def erab_accessibility(calc): # -> InitialEPSBEstabSR, AddedEPSBEstabSR
 #
 # fini/init events can be prefixed with "Σqci " or "Σcause ". If such prefix is
 # present, then fini/init value is obtained via call to Σqci or Σcause correspondingly.
-@func(Calc)
+@_func_nowrap(Calc)
 def _success_rate(calc, fini, init): # -> Interval in [0,1]
-    def vget(m, name):
-        if name.startswith("Σqci "):
-            return Σqci  (m, name[len("Σqci "):])
-        if name.startswith("Σcause "):
-            return Σcause(m, name[len("Σcause "):])
-        return m[name]
-
-    t_     = 0.
-    Σt     = 0.
-    Σinit  = 0
-    Σfini  = 0
-    Σufini = 0  # Σinit where fini=ø but init is not ø
-    for m in calc._miter():
-        τ = m['X.δT']
-        vinit = vget(m, init)
-        vfini = vget(m, fini)
-        if isNA(vinit):
-            t_ += τ
-            # ignore fini, even if it is not ø.
-            # TODO more correct approach: init⁺ for this period ∈ [fini,∞] and
-            # once we extrapolate init⁺ we should check if it lies in that
-            # interval and adjust if not. Then fini could be used as is.
-        else:
-            Σt += τ
-            Σinit += vinit
-            if isNA(vfini):
-                Σufini += vinit
-            else:
-                Σfini += vfini
+    # NOTE only data from the log is used: time holes bring NA init and are
+    # accounted for via t_ as the time not covered by periods with init data.
+    δT    = calc._col('X.δT')
+    vinit = calc._vcol(init)
+    vfini = calc._vcol(fini)
+    init_na = isNA(vinit)
+    fini_na = isNA(vfini)
+
+    # NOTE if init=ø fini is ignored, even if it is not ø.
+    # TODO more correct approach: init⁺ for this period ∈ [fini,∞] and
+    # once we extrapolate init⁺ we should check if it lies in that
+    # interval and adjust if not. Then fini could be used as is.
+    Σt     = δT[~init_na].sum()
+    t_     = (calc.τ_hi - calc.τ_lo) - Σt
+    Σinit  = vinit[~init_na].sum()
+    Σfini  = vfini[~init_na & ~fini_na].sum()
+    Σufini = vinit[~init_na &  fini_na].sum()   # Σinit where fini=ø but init is not ø
 
     if Σinit == 0 or Σt == 0:
-        return Interval(0,1)    # full uncertainty
+        return _interval(0,1)   # full uncertainty
 
     init_ = t_ * Σinit / Σt
     a =  Σfini                   / (Σinit + init_)
     b = (Σfini + init_ + Σufini) / (Σinit + init_)
-    return Interval(a,b)
+    return _interval(a,b)
+
+# _vcol returns values of name for every measurement in ._data .
+#
+# name can be prefixed with "Σqci " or "Σcause " - see _success_rate for details.
+@_func_nowrap(Calc)
+def _vcol(calc, name):
+    if name.startswith("Σqci "):
+        _all_x = _all_qci
+        name   = name[len("Σqci "):]
+    elif name.startswith("Σcause "):
+        _all_x = _all_cause
+        name   = name[len("Σcause "):]
+    else:
+        return calc._col(name)
+
+    # vectorized _Σx
+    name_sum, name_xv = _all_x(name)
+    s = calc._col(name_sum)
+    sna = isNA(s)
+    if len(name_xv) == 0  or  not sna.any():
+        return s    # NOTE if .sum is NA and there is no x the result is NA
+    x = calc._col(name)                                 # [M, nx]
+    xs = x.sum(axis=1, dtype=s.dtype)
+    xs[isNA(x).any(axis=1)] = NA(s.dtype)               # NA if any value is NA
+    return np.where(sna, xs, s)
 
 
 # eutran_ip_throughput computes "E-UTRAN IP Throughput" KPI.
@@ -753,124 +1030,171 @@ def _success_rate(calc, fini, init): # -> Interval in [0,1]
 #
 # 3GPP reference: TS 32.450 6.3.1 "E-UTRAN IP Throughput".
 @func(Calc)
+@_memoize
 def eutran_ip_throughput(calc): # -> IPThp[QCI][dl,ul]
-    qdlΣv  = np.zeros(nqci, dtype=np.float64)
-    qdlΣt  = np.zeros(nqci, dtype=np.float64)
-    qdlΣte = np.zeros(nqci, dtype=np.float64)
-    qulΣv  = np.zeros(nqci, dtype=np.float64)
-    qulΣt  = np.zeros(nqci, dtype=np.float64)
-    qulΣte = np.zeros(nqci, dtype=np.float64)
-
-    for m in calc._miter():
-        for qci in range(nqci):
-            dl_vol      = m["DRB.IPVolDl.QCI"]          [qci]
-            dl_time     = m["DRB.IPTimeDl.QCI"]         [qci]
-            dl_time_err = m["XXX.DRB.IPTimeDl_err.QCI"] [qci]
-            ul_vol      = m["DRB.IPVolUl.QCI"]          [qci]
-            ul_time     = m["DRB.IPTimeUl.QCI"]         [qci]
-            ul_time_err = m["XXX.DRB.IPTimeUl_err.QCI"] [qci]
-
-            if isNA(dl_vol) or isNA(dl_time) or isNA(dl_time_err):
-                # don't account uncertainty - here it is harder to do compared
-                # to erab_accessibility and the benefit is not clear. Follow
-                # plain 3GPP spec for now.
-                pass
-            else:
-                qdlΣv[qci]  += dl_vol
-                qdlΣt[qci]  += dl_time
-                qdlΣte[qci] += dl_time_err
-
-            if isNA(ul_vol) or isNA(ul_time) or isNA(ul_time_err):
-                # no uncertainty accounting - see ^^^
-                pass
-            else:
-                qulΣv[qci]  += ul_vol
-                qulΣt[qci]  += ul_time
-                qulΣte[qci] += ul_time_err
+    # Σ over measurements of vol, time and time_err for every qci
+    #
+    # only data from the log is used: time holes bring NA for everything and
+    # do not contribute.
+    def Σ(xvol, xtime, xtime_err): # -> qΣv, qΣt, qΣte
+        vol      = calc._col(xvol)          # [M, nqci]
+        time     = calc._col(xtime)
+        time_err = calc._col(xtime_err)
+        ok = isNA(vol)                  # NOTE masks are combined in place
+        ok |= isNA(time)                #      without allocating temporaries
+        ok |= isNA(time_err)
+        np.logical_not(ok, out=ok)
+        # don't account uncertainty - here it is harder to do compared
+        # to erab_accessibility and the benefit is not clear. Follow
+        # plain 3GPP spec for now.
+        return (np.where(ok, vol,      0).sum(axis=0, dtype=np.float64),
+                np.where(ok, time,     0).sum(axis=0, dtype=np.float64),
+                np.where(ok, time_err, 0).sum(axis=0, dtype=np.float64))
+
+    qdlΣv, qdlΣt, qdlΣte = Σ("DRB.IPVolDl.QCI", "DRB.IPTimeDl.QCI", "XXX.DRB.IPTimeDl_err.QCI")
+    qulΣv, qulΣt, qulΣte = Σ("DRB.IPVolUl.QCI", "DRB.IPTimeUl.QCI", "XXX.DRB.IPTimeUl_err.QCI")
 
     thp = np.zeros(nqci, dtype=np.dtype([
                             ('dl', Interval._dtype),
                             ('ul', Interval._dtype),
     ]))
-    for qci in range(nqci):
-        if qdlΣt[qci] > 0:
-            thp[qci]['dl']['lo'] = qdlΣv[qci] / (qdlΣt[qci] + qdlΣte[qci])
-            thp[qci]['dl']['hi'] = qdlΣv[qci] / (qdlΣt[qci] - qdlΣte[qci])
-        if qulΣt[qci] > 0:
-            thp[qci]['ul']['lo'] = qulΣv[qci] / (qulΣt[qci] + qulΣte[qci])
-            thp[qci]['ul']['hi'] = qulΣv[qci] / (qulΣt[qci] - qulΣte[qci])
+    for dir, qΣv, qΣt, qΣte in (('dl', qdlΣv, qdlΣt, qdlΣte),
+                                ('ul', qulΣv, qulΣt, qulΣte)):
+        q = qΣt > 0
+        thp[dir]['lo'][q] = qΣv[q] / (qΣt[q] + qΣte[q])
+        thp[dir]['hi'][q] = qΣv[q] / (qΣt[q] - qΣte[q])
 
     return thp
 
 
 # aggregate aggregates values of all Measurements in covered time interval.
+#
+# The result is memoized in MeasurementLog similarly to KPIs.
+#
+# The aggregation is done column-wise: every field is reduced over all covered
+# Measurements at once with .QCI subarrays being reduced as 2D arrays. The
+# result is the same as if Measurements were accumulated one by one in time
+# order with time holes in data being accounted as NA.
+#
+# NOTE fields are taken via ._fcol, not ._col: aggregate goes through all
+# fields, and materializing columns for all of them would duplicate whole log
+# in memory. Columns that are already materialized, e.g. by KPIs, are used.
 @func(Calc)
+@_memoize
 def aggregate(calc): # -> ΣMeasurement
     Σ = ΣMeasurement()
     Σ['X.Tstart'] = calc.τ_lo
     Σ['X.δT']     = calc.τ_hi - calc.τ_lo
 
-    def xmin(a, b):
-        if isNA(a): return b
-        if isNA(b): return a
-        return min(a, b)
-
-    def xmax(a, b):
-        if isNA(a): return b
-        if isNA(b): return a
-        return max(a, b)
-
-    def xavg(a, na, b, nb): # -> <ab>, na+nb
-        if isNA(a) or isNA(na):
-            return b, nb
-        if isNA(b) or isNA(nb):
-            return a, na
-        nab = na+nb
-        ab = (a*na + b*nb)/nab
-        return ab, nab
-
-    for m in calc._miter():
-        for field in m.dtype.names:
-            if field.startswith('X.'):  # X.Tstart, X.δT
-                continue
-
-            v = m[field]
-            if v.shape != ():           # skip subarrays - rely on aliases
-                continue
-
-            Σf = Σ[field]       # view to Σ[field]
-            Σv = Σf['value']    # view to Σ[field]['value']
-
-            if isNA(v):
-                Σf['τ_na'] += m['X.δT']
-                continue
-
-            if isNA(Σv):
-                Σf['value'] = v
-                continue
-
-            if isinstance(v, np.number):
-                Σf['value'] += v
-
-            elif isinstance(v, StatT):
-                Σv['min'] = xmin(Σv['min'], v['min'])
-                Σv['max'] = xmax(Σv['max'], v['max'])
-                # TODO better sum everything and then divide as a whole to avoid loss of precision
-                Σv['avg'], _ = xavg(Σv['avg'], m['X.Tstart'] - Σ['X.Tstart'] - Σf['τ_na'],
-                                     v['avg'], m['X.δT'])
-
-            elif isinstance(v, Stat):
-                Σv['min'] = xmin(Σv['min'], v['min'])
-                Σv['max'] = xmax(Σv['max'], v['max'])
-                # TODO better sum everything and then divide as a whole to avoid loss of precision
-                Σv['avg'], Σv['n'] = xavg(Σv['avg'], Σv['n'],
-                                           v['avg'],  v['n'])
+    δT = calc._col('X.δT')
+    τ_gap = (calc.τ_hi - calc.τ_lo) - δT.sum()  # time not covered by data
+    l  = len(δT)
 
-            else:
-                raise AssertionError("Calc.aggregate: unexpected type %r" % type(v))
+    for field, kind in Measurement._fieldv:
+        col = calc._fcol(field)
+        shape = col.shape[1:]
+        col = col.reshape((l, int(np.prod(shape))))  # [l,1] for scalars, [l,nqci] for subarrays
+        Σf  = Σ[field]              # view to Σ[field]
+
+        na = isNA(col)
+        ok = ~na
+        okany = ok.any(axis=0)
+        Σf['τ_na'] = (δT @ na + τ_gap).reshape(shape)  # NOTE δT-weighted sums are done via matmul
+
+        if kind is np.number:
+            Σv = np.where(ok, col, 0).sum(axis=0, dtype=col.dtype)
+            Σf['value'] = np.where(okany, Σv, NA(col.dtype)).reshape(shape)
+            continue
+
+        # StatT | Stat
+        Σv = {}
+        Σv['min'] = _xmin(col['min'])
+        Σv['max'] = _xmax(col['max'])
+
+        a = col['avg']
+        if kind is StatT:
+            # avg weighted by time
+            vok = ok & ~isNA(a)
+            Σt  = δT @ vok
+            Σat = δT @ np.where(vok, a, 0)
+            with np.errstate(invalid='ignore'):
+                Σv['avg'] = Σat / Σt
+            # if there are non-NA StatT with NA avg, their time is accounted with
+            # avg accumulated before them; handle such rare cases exactly as
+            # accumulation one-by-one does.
+            for q in np.nonzero(okany & (ok & ~vok).any(axis=0))[0]:
+                rows = ok[:,q]
+                Σv['avg'][q] = _xavgT(a[rows,q], δT[rows])
+
+        else:
+            # avg weighted by n
+            n = col['n']
+            vok = ok & ~isNA(a) & ~isNA(n)
+            Σn  = np.where(vok, n, 0).sum(axis=0)
+            Σan = np.where(vok, a*n, 0).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                Σv['avg'] = Σan / Σn
+            Σv['n'] = Σn
+            # handle cases without positive total n exactly as accumulation one-by-one does
+            for q in np.nonzero(okany & ~(vok.any(axis=0) & (Σn > 0)))[0]:
+                rows = ok[:,q]
+                Σv['avg'][q], Σv['n'][q] = _xavgN(a[rows,q], n[rows,q])
+
+        Σf_v = Σf['value']
+        for x in Σv:
+            vna = NA(Σv[x].dtype) if x != 'n'  else NA(n.dtype)
+            Σf_v[x] = np.where(okany, Σv[x], vna).reshape(shape)
 
     return Σ
 
+# _xmin and _xmax reduce v along axis 0 ignoring NA values.
+#
+# Positions where all values are NA are reduced to NA.
+#
+# NA for floats is NaN, which np.fmin/np.fmax already ignore. NA for integers
+# is their minimum value, which is already the identity for max; for min it is
+# masked out.
+def _xmin(v):
+    if issubclass(v.dtype.type, np.floating):
+        return np.fmin.reduce(v, axis=0, initial=np.nan)
+    na  = NA(v.dtype)
+    vok = (v != na)
+    return np.where(vok.any(axis=0), np.minimum.reduce(v, axis=0, where=vok, initial=np.iinfo(v.dtype).max),
+                    na)
+
+def _xmax(v):
+    if issubclass(v.dtype.type, np.floating):
+        return np.fmax.reduce(v, axis=0, initial=np.nan)
+    return np.maximum.reduce(v, axis=0, initial=NA(v.dtype))
+
+# _xavg returns average of a and b weighted by na and nb.
+#
+# NA values are ignored.
+def _xavg(a, na, b, nb): # -> <ab>, na+nb
+    if isNA(a) or isNA(na):
+        return b, nb
+    if isNA(b) or isNA(nb):
+        return a, na
+    nab = na+nb
+    ab = (a*na + b*nb)/nab
+    return ab, nab
+
+# _xavgT accumulates one-by-one time-weighted average of StatT values.
+def _xavgT(av, δTv): # -> avg
+    a = av[0]
+    τ = δTv[0]
+    for b, δt in zip(av[1:], δTv[1:]):
+        a, _ = _xavg(a, τ, b, δt)
+        τ += δt
+    return a
+
+# _xavgN accumulates one-by-one n-weighted average of Stat values.
+def _xavgN(av, nv): # -> avg, n
+    a, n = av[0], nv[0]
+    for b, nb in zip(av[1:], nv[1:]):
+        a, n = _xavg(a, n, b, nb)
+    return a, n
+
 # sum is deprecated alias to aggregate.
 @func(Calc)
 def sum(calc):
@@ -882,31 +1206,33 @@ def sum(calc):
 #
 # The measurements are yielded with consecutive timestamps. There is no gaps
 # as NA Measurements are yielded for time holes in original MeasurementLog data.
+#
+# NOTE KPIs and aggregate work on columns provided by _col instead of going
+# through Measurements one by one. _miter is kept for callers that need whole
+# Measurements.
 @func(Calc)
 def _miter(calc): # -> iter(Measurement)
-    τ = calc.τ_lo
-    l = len(calc._data)
-    i = 0  # current Measurement from data
+    Tstart = calc._col('X.Tstart')
+    Tend   = Tstart + calc._col('X.δT')
+    assert (Tstart < Tend).all()
 
-    while i < l:
-        m = calc._data[i]
-        m_τlo = m['X.Tstart']
-        m_τhi = m_τlo + m['X.δT']
-        assert m_τlo < m_τhi
+    # find holes in between measurements at once
+    # holes before i'th measurement are [τv[i], Tstart[i])
+    τv   = np.concatenate(((calc.τ_lo,), Tend[:-1]))
+    hole = (τv < Tstart).tolist()
 
-        if τ < m_τlo:
+    for i, m in enumerate(calc._data):
+        if hole[i]:
             # <- M(ø)[τ, m_τlo)
             h = Measurement()
-            h['X.Tstart'] = τ
-            h['X.δT']     = m_τlo - τ
+            h['X.Tstart'] = τv[i]
+            h['X.δT']     = Tstart[i] - τv[i]
             yield h
 
         # <- M from mlog
         yield m
 
-        τ = m_τhi
-        i += 1
-
+    τ = Tend[-1]  if len(Tend) > 0  else calc.τ_lo
     assert τ <= calc.τ_hi
     if τ < calc.τ_hi:
         # <- trailing M(ø)[τ, τ_hi)
@@ -919,7 +1245,14 @@ def _miter(calc): # -> iter(Measurement)
 # Interval(lo,hi) creates new interval with specified boundaries.
 @func(Interval)
 def __new__(cls, lo, hi):
-    i = _newscalar(cls, cls._dtype)
+    return _interval(lo, hi)
+
+# _interval is fast equivalent of Interval(lo,hi) for use in KPI computations.
+#
+# it avoids the overhead of going through @func-wrapped __new__, which is
+# several times more than the cost of creating the Interval itself.
+def _interval(lo, hi): # -> Interval
+    i = _newscalar(Interval, Interval._dtype)
     i['lo'] = lo
     i['hi'] = hi
     return i
@@ -951,43 +1284,53 @@ def _Σx(m: Measurement, name_x: str, _all_x: func):
     s = m[name_sum]
     if not isNA(s):
         return s
-    s  = s.dtype.type(0)
-    ok = True  if len(name_xv) > 0  else False
-    for _ in name_xv:
-        v = m[_]
-        # we don't know the answer even if single value is NA
-        # (if data source does not support particular qci/cause, it should set it to 0)
-        if isNA(v):
-            ok = False
-        else:
-            s += v
-    if not ok:
+    if len(name_xv) == 0:
         return NA(s.dtype)
-    else:
-        return s
+    # name_xv are aliases to elements of m[name_x] subarray - sum it at once
+    v = m[name_x]
+    # we don't know the answer even if single value is NA
+    # (if data source does not support particular qci/cause, it should set it to 0)
+    if isNA(v).any():
+        return NA(s.dtype)
+    return v.sum(dtype=s.dtype)
 
 
 # _i2pc maps Interval in [0,1] to one in [0,100] by multiplying lo/hi by 1e2.
 def _i2pc(x: Interval): # -> Interval
-    return Interval(x['lo']*100, x['hi']*100)
+    return _interval(x['lo']*100, x['hi']*100)
 
 
 # _newscalar creates new NumPy scalar instance with specified type and dtype.
-def _newscalar(typ, dtype):
-    dtyp = np.dtype((typ, dtype))   # dtype with .type adjusted to be typ
-    assert dtyp == dtype
-    assert dtyp.type is typ
-    _ = np.zeros(shape=(), dtype=dtyp)
-    s = _[()]
+#
+# The scalar is initialized with zeros, or with copy of init raw data if it is provided.
+def _newscalar(typ, dtype, init=None):
+    dtyp = _newscalar_dtypes.get((typ, dtype))
+    if dtyp is None:
+        dtyp = np.dtype((typ, dtype))   # dtype with .type adjusted to be typ
+        assert dtyp == dtype            # NOTE slow for Measurement - do it only once
+        assert dtyp.type is typ
+        _newscalar_dtypes[(typ, dtype)] = dtyp
+    if init is None:
+        _ = np.zeros(shape=(), dtype=dtyp)
+        s = _[()]
+    else:
+        _ = np.frombuffer(bytearray(init), dtype=dtyp)
+        s = _[0]
     assert type(s) is typ
     assert s.dtype is dtyp
     return s
 
+_newscalar_dtypes = {}  # (typ, dtype) -> dtype with .type adjusted to be typ
+
 
 # ---- NA ----
 
 # NA returns "Not Available" value for dtype.
 def NA(dtype):
+    na = _NA_scalars.get(dtype)
+    if na is not None:
+        return na
+
     typ = dtype.type
     # float
     if issubclass(typ, np.floating):
@@ -996,43 +1339,69 @@ def NA(dtype):
     elif issubclass(typ, np.signedinteger):
         na = typ(np.iinfo(typ).min)
     # structure: NA is combination of NAs for fields
+    # it is prepared once and then created anew from its raw bytes, since
+    # structured scalars are mutable and cannot be shared.
     elif issubclass(typ, np.void):
-        na = _newscalar(typ, dtype)
-        for field in dtype.names:
-            na[field] = NA(dtype.fields[field][0])
+        init = _NA_structs.get(dtype)
+        if init is None:
+            na = _newscalar(typ, dtype)
+            for field in dtype.names:
+                na[field] = NA(dtype.fields[field][0])
+            init = _NA_structs[dtype] = na.tobytes()
+        na = _newscalar(typ, dtype, init)
     else:
         raise AssertionError("NA not defined for dtype %s" % (dtype,))
 
     assert type(na) is typ
+    if not isinstance(na, np.void):     # numbers are immutable and can be shared
+        _NA_scalars[dtype] = na
     return na
 
+_NA_scalars = {}    # dtype -> NA for numeric dtypes
+_NA_structs = {}    # dtype -> raw bytes of NA for structured dtypes
+
 
 # isNA returns whether value represent NA.
 #
 # returns True/False if value is scalar.
 # returns array(True/False) if value is array.
 def isNA(value):
-    na = NA(value.dtype)
+    dtype = value.dtype
+    kind  = dtype.kind
 
-    # `nan == nan` gives False
-    # work it around by checking for nan explicitly
-    if isinstance(na, np.void): # items are structured scalars
-        vna = None
-        for field in value.dtype.names:
-            nf = na[field]
-            vf = value[field]
-            if np.isnan(nf):
-                x = np.isnan(vf)
-            else:
-                x = (vf == nf)
+    # float: NA is nan
+    # `nan == nan` gives False, so nan is the only value for which `v != v`
+    if kind == 'f':
+        return value != value
 
+    # items are structured scalars: NA if all fields are NA
+    if kind == 'V':
+        vna = None
+        for field in dtype.names:
+            x = isNA(value[field])
             if vna is None:
                 vna = x
             else:
                 vna &= x
         return vna
-    else:
-        if np.isnan(na):
-            return np.isnan(value)
 
-    return value == na
+    return value == NA(dtype)
+
+
+# prepare NA templates for Measurement() and ΣMeasurement().
+def _(Klass):
+    x = _newscalar(Klass, Klass._dtype)
+    x._fillNA()
+    Klass._NA_bytes = x.view(Klass._dtype0).tobytes()
+_(Measurement)
+_(ΣMeasurement)
+del _
+
+# Measurement._fieldrawv lists fields of Measurement._dtype0 together with
+# [lo,hi) range of their raw bytes.
+def _():
+    fields = Measurement._dtype0.fields
+    Measurement._fieldrawv = tuple((name, fields[name][1], fields[name][1] + fields[name][0].itemsize)
+                                        for name in Measurement._dtype0.names)
+_()
+del _
@@ -191,6 +191,137 @@ def test_MeasurementLog():
     assert _.dtype == (Measurement, Measurement._dtype)
     assert _.shape == (0,)
 
+    # append many - storage is grown as needed
+    mv = []
+    for i in range(100):
+        m = Measurement()
+        m['X.Tstart'] = 10 + i
+        m['X.δT']     = 1
+        m['S1SIG.ConnEstabAtt'] = i
+        mlog.append(m)
+        mv.append(m)
+    _ = mlog.data()
+    assert _.dtype == (Measurement, Measurement._dtype)
+    assert _.shape == (100,)
+    assert list(_) == mv
+
+    # forget does not change data previously returned by .data()
+    mlog.forget_past(50)
+    d = mlog.data()
+    assert d.shape == (59,)
+    assert list(d) == mv[41:]
+    assert list(_) == mv
+
+
+# verify MeasurementLog.extend .
+def test_MeasurementLog_extend():
+    src = MeasurementLog()
+    for i in range(20):
+        m = Measurement()
+        m['X.Tstart'] = 10 + 2*i
+        m['X.δT']     = 1
+        m['S1SIG.ConnEstabAtt']  = i
+        m['S1SIG.ConnEstabSucc'] = i // 2
+        src.append(m)
+    mv = list(src.data())
+
+    mlog = MeasurementLog()
+    mlog.extend(src.data()[:0])
+    assert mlog.data().shape == (0,)
+    mlog.extend(src.data()[:5])
+    mlog.extend(src.data()[5:])
+    _ = mlog.data()
+    assert _.dtype == (Measurement, Measurement._dtype)
+    assert list(_) == mv
+
+    # .Tstart↑ is verified against the log tail and inside the batch
+    with raises(AssertionError, match=r"\.Tstart not ↑"):
+        mlog.extend(src.data()[-2:])
+    with raises(AssertionError, match=r"\.Tstart not ↑"):
+        MeasurementLog().extend(src.data()[::-1])
+    m = Measurement()
+    m['X.Tstart'] = 20.5
+    m['X.δT']     = 1
+    with raises(AssertionError, match=r"\.Tstart overlaps with previous measurement"):
+        MeasurementLog().extend(np.concatenate((src.data()[:6], m.reshape(1))))
+
+    # data validity is verified for every measurement
+    m = Measurement()
+    m['X.Tstart'] = 100
+    m['X.δT']     = 1
+    m['S1SIG.ConnEstabAtt']  = 1
+    m['S1SIG.ConnEstabSucc'] = 2
+    m['DRB.IPVolDl.7']       = -1
+    with raises(AssertionError, match=r"\[1\] \.DRB\.IPVolDl\.7 < 0") as e:
+        MeasurementLog().extend(np.concatenate((src.data()[:1], m.reshape(1))))
+    assert "[1] fini > init (2(S1SIG.ConnEstabSucc) / 1(S1SIG.ConnEstabAtt)" in str(e.value)
+    with raises(AssertionError, match=r"invalid Measurement data"):
+        mlog.append(m)
+    assert list(mlog.data()) == mv
+
+
+# verify MeasurementLog.column and its use by Calc.
+def test_MeasurementLog_column():
+    mlog = MeasurementLog()
+    def M(τ, v):
+        m = Measurement()
+        m['X.Tstart'] = τ
+        m['X.δT']     = 1
+        m['S1SIG.ConnEstabAtt'] = v
+        m['DRB.IPVolDl.QCI'][:] = 0
+        m['DRB.IPVolDl.7']      = v
+        return m
+
+    def _(name):
+        col = mlog.column(name)
+        d   = mlog.data()[name]
+        assert col.dtype == d.dtype
+        assert col.shape == d.shape
+        assert col.flags.c_contiguous
+        assert not col.flags.writeable
+        assert (col == d).all()
+
+    _('S1SIG.ConnEstabAtt')
+    for i in range(10):
+        mlog.append(M(i, i))
+    _('S1SIG.ConnEstabAtt')
+    _('DRB.IPVolDl.QCI')
+    for i in range(10, 30):                 # materialized columns are kept in sync
+        mlog.append(M(i, i))
+    _('S1SIG.ConnEstabAtt')
+    _('DRB.IPVolDl.QCI')
+    _('DRB.IPVolDl.7')
+    with raises(ValueError): mlog.column('XXXunknownfield')
+
+    # logged data cannot be modified, so that columns cannot go out of sync
+    with raises(ValueError, match='read-only'):
+        mlog.data()['S1SIG.ConnEstabAtt'] = 100
+    _('S1SIG.ConnEstabAtt')
+
+    # Calc keeps on working with its data even if mlog forgets the past
+    calc = Calc(mlog, 5, 15)
+    mlog.forget_past(20)
+    _('S1SIG.ConnEstabAtt')
+    _('DRB.IPVolDl.QCI')
+    assert list(calc._col('S1SIG.ConnEstabAtt')) == list(range(5, 15))
+    assert list(calc._col('DRB.IPVolDl.7'))      == list(range(5, 15))
+    calc = Calc(mlog, 25, 27)
+    mlog.forget_past(21)
+    assert list(calc._col('S1SIG.ConnEstabAtt')) == [25, 26]
+
+    # forgetting most of the log moves the rest to smaller storage
+    assert len(mlog._buf.base) == 32
+    calc = Calc(mlog, 27, 29)
+    mlog.forget_past(26)
+    assert mlog._buf.base is None
+    assert len(mlog._buf) == 8
+    _('S1SIG.ConnEstabAtt')
+    _('DRB.IPVolDl.QCI')
+    assert list(calc._col('S1SIG.ConnEstabAtt')) == [27, 28]
+    mlog.append(M(30, 30))
+    _('S1SIG.ConnEstabAtt')
+    _('DRB.IPVolDl.7')
+
 
 # verify (τ_lo, τ_hi) widening and overlapping with Measurements on Calc initialization.
 def test_Calc_init():
@@ -522,6 +653,79 @@ def test_Calc_eutran_ip_throughput():
         assert thp[qci]['ul'] == I(0)
 
 
+# verify that KPIs computed by Calc are reused for the same window.
+def test_Calc_memoize():
+    mlog = MeasurementLog()
+    def mappend(τ, att, succ):
+        m = Measurement()
+        m['X.Tstart'] = τ
+        m['X.δT']     = 10
+        m['S1SIG.ConnEstabAtt']     = m['RRC.ConnEstabAtt.sum']     = att
+        m['S1SIG.ConnEstabSucc']    = m['RRC.ConnEstabSucc.sum']    = succ
+        m['ERAB.EstabInitAttNbr.sum']  = m['ERAB.EstabAddAttNbr.sum']  = att
+        m['ERAB.EstabInitSuccNbr.sum'] = m['ERAB.EstabAddSuccNbr.sum'] = succ
+        mlog.append(m)
+
+    mappend(10, 4, 2)
+    mappend(20, 4, 4)
+    _, add1 = Calc(mlog, 10,30).erab_accessibility()
+    assert add1 == Interval(75, 75)
+    assert len(mlog._kpicache) == 1
+
+    # the same window -> result is reused; returned values are independent copies
+    add1['lo'] = 0
+    _, add2 = Calc(mlog, 10,30).erab_accessibility()
+    assert add2 == Interval(75, 75)
+    assert len(mlog._kpicache) == 1
+
+    # different window -> computed anew
+    _, add3 = Calc(mlog, 20,30).erab_accessibility()
+    assert add3 == Interval(100, 100)
+    assert len(mlog._kpicache) == 2
+
+    # new data does not affect cached results for other windows
+    mappend(30, 4, 0)
+    _, add4 = Calc(mlog, 10,30).erab_accessibility()
+    assert add4 == Interval(75, 75)
+    _, add5 = Calc(mlog, 10,40).erab_accessibility()
+    assert add5 == Interval(50, 50)
+    assert len(mlog._kpicache) == 3
+
+    # forget_past drops results over forgotten measurements
+    mlog.forget_past(10)
+    assert len(mlog._kpicache) == 1
+    _, add6 = Calc(mlog, 20,30).erab_accessibility()
+    assert add6 == Interval(100, 100)
+    assert len(mlog._kpicache) == 1
+
+    # aggregate is memoized too
+    Σ1 = Calc(mlog, 20,40).aggregate()
+    assert Σ1['S1SIG.ConnEstabAtt']['value'] == 8
+    assert len(mlog._kpicache) == 2
+    Σ1['S1SIG.ConnEstabAtt']['value'] = 0
+    Σ2 = Calc(mlog, 20,40).aggregate()
+    assert type(Σ2) is ΣMeasurement
+    assert Σ2['S1SIG.ConnEstabAtt']['value'] == 8
+    assert len(mlog._kpicache) == 2
+
+    # number of memoized results is limited by .kpicache_max
+    mlog.kpicache_max = 2
+    _, add7 = Calc(mlog, 30,40).erab_accessibility()
+    assert add7 == Interval(0, 0)
+    assert len(mlog._kpicache) == 2
+    mlog.kpicache_max = 1
+    _, add8 = Calc(mlog, 20,40).erab_accessibility()
+    assert add8 == Interval(50, 50)
+    assert len(mlog._kpicache) == 1
+
+    # .kpicache_max=0 disables memoization
+    mlog.kpicache_max = 0
+    mlog._kpicache.clear()
+    _, add9 = Calc(mlog, 20,40).erab_accessibility()
+    assert add9 == Interval(50, 50)
+    assert len(mlog._kpicache) == 0
+
+
 # verify Calc.aggregate .
 def test_Calc_aggregate():
     mlog = MeasurementLog()
@@ -581,6 +785,26 @@ def test_Calc_aggregate():
             _(name)
 
 
+    # StatT with NA avg contributes to min/max, but not to avg
+    m3 = Measurement()
+    m3['X.Tstart'] = 8
+    m3['X.δT']     = 1
+    m3['DRB.UEActive'] = StatT(0, np.nan, 9)
+    mlog.append(m3)
+
+    M = Calc(mlog, 0, 10).aggregate()
+    assert M['DRB.UEActive']['value']   == StatT(0, (3.7*2 + 3.2*3)/(2+3), 9)
+    assert M['DRB.UEActive']['τ_na']    == 4
+    assert M['DRB.IPLatDl.7']['τ_na']   == 5
+
+    # aggregate gives the same result when columns are materialized in the log
+    for name in Measurement._dtype0.names:
+        mlog.column(name)
+    mlog._kpicache.clear()  # don't reuse memoized M
+    M2 = Calc(mlog, 0, 10).aggregate()
+    assert M2.reshape(1).view(np.uint8).tobytes() == M.reshape(1).view(np.uint8).tobytes()
+
+
 # verify Σqci.
 def test_Σqci():
     m = Measurement()
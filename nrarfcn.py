@@ -28,6 +28,8 @@ It complements pypi.org/project/nrarfcn and provides the following additional ut
 See also package xlte.earfcn which provides similar functionality for 4G.
 """
 
+import functools
+
 # import pypi.org/project/nrarfcn with avoiding name collision with xlte.nrarfcn even if xlte is installed in editable mode.
 def _():
     modname = 'nrarfcn'
@@ -77,14 +79,37 @@ def _():
 nr = _()
 
 
+# memoized versions of nr lookups used by dl2ul, ul2dl, dl2ssb and frequency.
+#
+# nr functions are pure, but go through its tables on every call which is
+# significantly more expensive than a dict lookup.
+def _memoize(f):
+    cached = functools.lru_cache(maxsize=4096, typed=True)(f)
+    def _(*argv):
+        try:
+            return cached(*argv)
+        except TypeError:
+            # unhashable argument, e.g. a list, is not cached and is passed to f
+            # as is, so that it is rejected by f the same way as without memoization
+            return f(*argv)
+    return _
+
+_get_frequency          = _memoize(nr.get_frequency)
+_get_frequency_by_gscn  = _memoize(nr.get_frequency_by_gscn)
+_get_gscn_by_frequency  = _memoize(nr.get_gscn_by_frequency)
+_get_nrarfcn            = _memoize(nr.get_nrarfcn)
+_get_nrarfcn_range      = _memoize(nr.get_nrarfcn_range)
+
+
 # dl2ul returns UL NR-ARFCN that corresponds to DL NR-ARFCN and band.
 def dl2ul(dl_nr_arfcn, band): # -> ul_nr_arfcn
-    dl_lo, dl_hi = nr.get_nrarfcn_range(band, 'dl')
+    band = _band(band)
+    dl_lo, dl_hi = _get_nrarfcn_range(band, 'dl')
     if dl_lo == 'N/A':
         raise ValueError('band%r does not have downlink spectrum' % band)
     if not (dl_lo <= dl_nr_arfcn <= dl_hi):
         raise ValueError('band%r: NR-ARFCN=%r is outside of downlink spectrum' % (band, dl_nr_arfcn))
-    ul_lo, ul_hi = nr.get_nrarfcn_range(band, 'ul')
+    ul_lo, ul_hi = _get_nrarfcn_range(band, 'ul')
     if ul_lo == 'N/A':
         raise KeyError('band%r, to which DL NR-ARFCN=%r belongs, does not have uplink spectrum' % (band, dl_nr_arfcn))
     if dl_nr_arfcn - dl_lo > ul_hi - ul_lo:
@@ -95,12 +120,13 @@ def dl2ul(dl_nr_arfcn, band): # -> ul_nr_arfcn
 
 # ul2dl returns DL NR-ARFCN that corresponds to UL NR-ARFCN and band.
 def ul2dl(ul_nr_arfcn, band): # -> dl_nr_arfcn
-    ul_lo, ul_hi = nr.get_nrarfcn_range(band, 'ul')
+    band = _band(band)
+    ul_lo, ul_hi = _get_nrarfcn_range(band, 'ul')
     if ul_lo == 'N/A':
         raise ValueError('band%r does not have uplink spectrum' % band)
     if not (ul_lo <= ul_nr_arfcn <= ul_hi):
         raise ValueError('band%r: NR-ARFCN=%r is outside of uplink spectrum' % (band, ul_nr_arfcn))
-    dl_lo, dl_hi = nr.get_nrarfcn_range(band, 'dl')
+    dl_lo, dl_hi = _get_nrarfcn_range(band, 'dl')
     if dl_lo == 'N/A':
         raise KeyError('band%r, to which UL NR-ARFCN=%r belongs, does not have downlink spectrum' % (band, ul_nr_arfcn))
     if ul_nr_arfcn - ul_lo > dl_hi - dl_lo:
@@ -119,59 +145,158 @@ def ul2dl(ul_nr_arfcn, band): # -> dl_nr_arfcn
 # KeyError   is raised if Fssb is not possible to find for given Fdl and band.
 # ValueError is raised if input parameters are incorrect.
 def dl2ssb(dl_nr_arfcn, band): # -> ssb_nr_arfcn, max_ssb_scs_khz
-    _trace('\ndl2ssb %r %r' % (dl_nr_arfcn, band))
-    dl_lo, dl_hi = nr.get_nrarfcn_range(band, 'dl')
+    band = _band(band)
+    _trace('\ndl2ssb %r %r', dl_nr_arfcn, band)
+    dl_lo, dl_hi = _get_nrarfcn_range(band, 'dl')
     if dl_lo == 'N/A':
         raise ValueError('band%r does not have downlink spectrum' % band)
     if not (dl_lo <= dl_nr_arfcn <= dl_hi):
         raise ValueError('band%r: NR-ARFCN=%r is outside of downlink spectrum' % (band, dl_nr_arfcn))
 
-    f = frequency(nrarfcn=dl_nr_arfcn)
-    _trace('f   %.16g' % f)
-
     # query all SSB SCS available in this band
-    if isinstance(band, int):
-        band = 'n%d' % band
-    tab_fr1 = nr.tables.applicable_ss_raster_fr1.table_applicable_ss_raster_fr1()
-    tab_fr2 = nr.tables.applicable_ss_raster_fr2.table_applicable_ss_raster_fr2()
-    scs_v = []
-    for tab in (tab_fr1, tab_fr2):
-        for row in tab.data:
-            if tab.get_cell(row, 'band') == band:
-                scs_v.append( tab.get_cell(row, 'scs') )
+    scs_v = _band_ssb_scs.get(band, ())
+    if len(scs_v) == 0:
+        raise KeyError('dl2ssb %r n%s: band has no SS raster defined' % (dl_nr_arfcn, band))
+
+    f = frequency(nrarfcn=dl_nr_arfcn)
+    _trace('f   %.16g', f)
 
     # for each scs↓ try to find suitable sync point
-    for scs_khz in sorted(scs_v, reverse=True):
-        _trace('trying scs %r' % scs_khz)
-        scs = scs_khz / 1000  # khz -> mhz
+    for scs_khz in scs_v:
+        _trace('trying scs %r', scs_khz)
 
         # locate nearby point on global sync raster and further search around it
         # until sync point aligns to be multiple of scs
-        gscn = nr.get_gscn_by_frequency(f)
+        #
+        # (f_sync - f) % scs repeats itself with period of _gsr_period(gscn),
+        # so if none of that many consecutive points align, further search
+        # in the same GSR range is pointless.
+        gscn = _get_gscn_by_frequency(f)
+        nmiss = 0
         while 1:
-            f_sync = nr.get_frequency_by_gscn(gscn)
-            f_sync_arfcn = nr.get_nrarfcn(f_sync)
+            f_sync = _get_frequency_by_gscn(gscn)
+            f_sync_arfcn = _get_nrarfcn(f_sync)
             if not (dl_lo <= f_sync_arfcn <= dl_hi):
                 break
-            # check `(f_sync - f) % scs == 0` with tolerating fp rounding
-            δf = f_sync - f
-            q, r = divmod(δf, scs)
-            r_scs = r / scs
-            _trace('gscn %d\tf_sync %.16g (%d)  δf %+.3f  //scs %d  %%scs %.16g·scs' % (gscn, f_sync, nr.get_nrarfcn(f_sync), δf, q, r_scs))
-            if abs(r_scs - round(r_scs)) < 1e-5:
-                _trace('-> %d %d' % (f_sync_arfcn, scs_khz))
+            # check `(f_sync - f) % scs == 0`
+            # do it exactly in integer kHz: frequencies on both NR-ARFCN
+            # raster and GSR are multiples of 1kHz, and so is scs.
+            δf_khz = round((f_sync - f) * 1000)
+            q, r = divmod(δf_khz, scs_khz)
+            _trace('gscn %d\tf_sync %.16g (%d)  δf %+.3f  //scs %d  %%scs %dkHz', gscn, f_sync, f_sync_arfcn, δf_khz/1000, q, r)
+            if r == 0:
+                _trace('-> %d %d', f_sync_arfcn, scs_khz)
                 return f_sync_arfcn, scs_khz
-            gscn += (+1 if δf > 0  else  -1)
+            gscn_ = gscn + (+1 if δf_khz > 0  else  -1)
+            period, gscn_start = _gsr_period(gscn)
+            if gscn_start != _gsr_period(gscn_)[1]:
+                nmiss = 0
+            else:
+                nmiss += 1
+                if nmiss >= period:
+                    break
+            gscn = gscn_
+
+    raise KeyError('dl2ssb %r n%s: cannot find SSB frequency that is both on GSR and aligns from dl modulo SSB SCS of the given band' % (dl_nr_arfcn, band))
+
+
+# _band normalizes band, given either as int or as 'nN' string, to int.
+#
+# band in other forms is returned as is for nr to reject it.
+def _band(band): # -> int
+    if isinstance(band, str)  and  band[:1] == 'n'  and  band[1:].isdigit():
+        return int(band[1:])
+    return band
+
 
-    raise KeyError('dl2ssb %r %s: cannot find SSB frequency that is both on GSR and aligns from dl modulo SSB SCS of the given band' % (dl_nr_arfcn, band))
+# _gsr_period returns period, in GSCN units, with which frequencies on Global
+# Synchronization Raster repeat themselves modulo any SSB SubCarrier Spacing,
+# and the first GSCN of GSR range that gscn belongs to.
+#
+# GSR is defined in TS 38.104 table 5.4.3.1-1 as
+#
+#        0 -  3000 MHz:  SS_REF = N·1200kHz + M·50kHz        GSCN = 3N + (M-3)/2   M ∈ {1,3,5}
+#     3000 - 24250 MHz:  SS_REF = 3000MHz + N·1.44MHz        GSCN = 7499 + N
+#    24250 - 100000 MHz: SS_REF = 24250.08MHz + N·17.28MHz   GSCN = 22256 + N
+#
+# and 1200kHz, 1.44MHz and 17.28MHz are all multiples of 15, 30, 120 and 240 kHz.
+def _gsr_period(gscn): # -> period, gscn_start
+    if gscn < 7499:
+        return 3, 0
+    if gscn < 22256:
+        return 1, 7499
+    return 1, 22256
+
+
+# _band_ssb_scs is table with SSB SubCarrier Spacings (kHz) available in every band.
+#
+# it is precomputed from applicable SS raster tables once, so that dl2ssb does
+# not need to scan those tables on every call. SCS of every band are unique
+# and go in ↓ order - the order in which dl2ssb tries them.
+_band_ssb_scs = {}  # band(int) -> ()scs_khz↓
+def _():
+    tab_fr1 = nr.tables.applicable_ss_raster_fr1.table_applicable_ss_raster_fr1()
+    tab_fr2 = nr.tables.applicable_ss_raster_fr2.table_applicable_ss_raster_fr2()
+    for tab in (tab_fr1, tab_fr2):
+        for row in tab.data:
+            band = _band(tab.get_cell(row, 'band'))
+            assert isinstance(band, int), band
+            _band_ssb_scs.setdefault(band, set()).add( tab.get_cell(row, 'scs') )
+    for band, scs_v in _band_ssb_scs.items():
+        _band_ssb_scs[band] = tuple(sorted(scs_v, reverse=True))
+_()
 
 
 # frequency returns frequency corresponding to DL or UL NR-ARFCN.
+#
+# nrarfcn can be also an array of NR-ARFCNs, in which case array of
+# corresponding frequencies is returned.
 def frequency(nrarfcn): # -> freq (MHz)
-    return nr.get_frequency(nrarfcn)
+    if hasattr(nrarfcn, 'dtype'):   # NumPy array
+        return _frequency_v(nrarfcn)
+    return _get_frequency(nrarfcn)
 
+# _frequency_v serves frequency for array of NR-ARFCNs.
+#
+# It computes all frequencies at once with the formula of global frequency raster
+#
+#   F_REF = F_REF-Offs + ΔF_Global·(N_REF - N_REF-Offs)
+#
+# instead of going through nr.get_frequency for every NR-ARFCN.
+def _frequency_v(nrarfcn_v): # -> []freq (MHz)
+    import numpy as np
+    n_min, n_max, n_offs, f_offs_khz, δf_khz = _gfr()
+    if not np.issubdtype(nrarfcn_v.dtype, np.integer):
+        raise ValueError('NR-ARFCN must be an integer.')
+    n = nrarfcn_v.astype(np.int64)
+    if not ((0 <= n) & (n <= n_max)).all():
+        raise ValueError('NR-ARFCN must be between 0 and %s.' % format(n_max, ','))
+    i = np.searchsorted(n_min, n, side='right') - 1
+    freq_khz = f_offs_khz[i] + δf_khz[i]*(n - n_offs[i])
+    return freq_khz / 1000
 
+# _gfr returns table of global frequency raster ranges, as arrays, for _frequency_v.
+#
+# it is prepared on first use, so that importing xlte.nrarfcn does not
+# require importing numpy.
+@functools.lru_cache(maxsize=None)
+def _gfr(): # -> n_min[], n_max, n_offs[], f_offs_khz[], δf_khz[]
+    import numpy as np
+    tab = nr.tables.freq_nrarfcn.table_freq_nrarfcn()
+    col = lambda name: np.array([tab.get_cell(row, name) for row in tab.data])
+    n_min      = col('n_ref_min')
+    n_max      = int(col('n_ref_max')[-1])
+    n_offs     = col('n_ref_offs')
+    f_offs_khz = np.rint(col('f_ref_offs') * 1000).astype(np.int64)
+    δf_khz     = col('df_global')
+    assert (n_min[1:] == col('n_ref_max')[:-1] + 1).all()
+    return n_min, n_max, n_offs, f_offs_khz, δf_khz
+
+
+# _trace prints format % argv if _debug is enabled.
+#
+# formatting is done only when the output is actually printed.
 _debug = False
-def _trace(*argv):
+def _trace(format, *argv):
     if _debug:
-        print(*argv)
+        print(format % argv)
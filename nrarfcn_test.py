@@ -20,6 +20,7 @@
 from xlte.nrarfcn import frequency, dl2ul, ul2dl, dl2ssb
 from xlte.nrarfcn import nr
 
+import numpy as np
 from pytest import raises
 
 
@@ -89,6 +90,15 @@ def test_nrarfcn():
     _( 78,  632629,  632629,  3489.435, 3489.435, 'TDD', KeyError, None)
     _(257, 2079168, 2079168, 28000.14, 28000.14,  'TDD', KeyError, None)
 
+    # dl point at band edge, with nearby GSR points being outside of the band -> ssb cannot be found
+    _(  1,  422000,  384000,  2110,     1920,     'FDD', KeyError, None)
+
+
+    # band can be also specified as 'nN'
+    assert dl2ul (428000, 'n1')  == 390000
+    assert ul2dl (390000, 'n1')  == 428000
+    assert dl2ssb(632628, 'n78') == (632640, 30)
+
 
     # error in input parameters -> ValueError
     def edl(band, dl_nr_arfcn, estr):
@@ -105,3 +115,32 @@ def test_nrarfcn():
     # mismatch between x_nr_arfcn and band
     edl( 1, 10000, 'band1: NR-ARFCN=10000 is outside of downlink spectrum')
     eul( 1, 10000, 'band1: NR-ARFCN=10000 is outside of uplink spectrum')
+    # arguments of invalid type, including unhashable ones
+    for f in (dl2ul, ul2dl, dl2ssb):
+        with raises(ValueError, match='band must be an integer'):
+            f(428000, [1])
+    with raises(ValueError, match='must be an integer'):
+        frequency([428000])
+    # band that compares equal to valid integer band is still rejected after
+    # that integer band was used
+    for f, x_nr_arfcn in ((dl2ul, 428000), (ul2dl, 390000), (dl2ssb, 428000)):
+        f(x_nr_arfcn, 1)
+        with raises(ValueError, match='band must be an integer'):
+            f(x_nr_arfcn, 1.0)
+        with raises(ValueError, match='Invalid band: nTrue'):
+            f(x_nr_arfcn, True)
+
+
+# verify frequency on arrays of NR-ARFCN.
+def test_frequency_array():
+    nv = np.array([0, 1, 176300, 428000, 599999, 600000, 632628, 2016666, 2016667, 2079167, 3279165])
+    fv = frequency(nv)
+    assert fv.shape == nv.shape
+    assert list(fv) == [frequency(int(_)) for _ in nv]
+    assert frequency(nv.reshape(-1,1)).shape == (len(nv), 1)
+
+    for bad in (-1, 3279166):
+        with raises(ValueError, match='must be between'):
+            frequency(np.array([428000, bad]))
+    with raises(ValueError, match='must be an integer'):
+        frequency(np.array([428000.5]))
@@ -22,6 +22,7 @@ from __future__ import print_function, division, absolute_import
 
 from setuptools import setup, find_packages
 from setuptools.command.build_py import build_py as _build_py
+import importlib.util
 
 
 # build_py that
@@ -54,12 +55,13 @@ class build_py(_build_py):
 
         # add synthesized __init__.py to outputs, so that `pip uninstall`
         # works without leaving it
+        # py3 puts bytecode into __pycache__/ - not next to .py as .pyc / .pyo
         outputs.append(self.initfile)
         if include_bytecode:
             if self.compile:
-                outputs.append(self.initfile + 'c')
-            if self.optimize:
-                outputs.append(self.initfile + 'o')
+                outputs.append(importlib.util.cache_from_source(self.initfile, optimization=''))
+            if self.optimize > 0:
+                outputs.append(importlib.util.cache_from_source(self.initfile, optimization=self.optimize))
 
         return outputs
 